@@ -9,14 +9,15 @@ import pandas as pd
 import numpy as np
 import pydeck as pdk
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
-import matplotlib.pyplot as plt
-import requests
-import json
-from datetime import datetime, timedelta
-import geopy.distance
+from sklearn.ensemble import HistGradientBoostingRegressor
+from datetime import datetime
+import hashlib
+import joblib
+import sklearn
 from geopy.geocoders import Nominatim
 
+from emel_data import CACHE_DIR, load, preprocess, replace_atomically
+
 # --------------------------------------------------------------
 # 🧱 Page Configuration
 # --------------------------------------------------------------
@@ -63,312 +64,8 @@ with st.expander("📋 About EMEL Parking Data Structure"):
     This data enables accurate parking predictions based on real historical patterns and current occupancy trends.
     """)
 
-# --------------------------------------------------------------
-# 📥 Load Real EMEL Data from Open Data Portal
-# --------------------------------------------------------------
-
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def load_real_emel_data():
-    """
-    Load real EMEL parking data from their open data API
-    """
-    try:
-        # EMEL Open Data API endpoints - try multiple possible endpoints
-        api_endpoints = [
-            "https://opendata.emel.pt/api/records/1.0/search/",
-            "https://dados.gov.pt/api/records/1.0/search/",
-            "https://opendata.emel.pt/api/datasets/1.0/search/"
-        ]
-        
-        locations = []
-        history = []
-        
-        for api_base in api_endpoints:
-            try:
-                # Try different dataset names that EMEL might use
-                dataset_names = [
-                    "parques-de-estacionamento",
-                    "parques-estacionamento", 
-                    "parking-lots",
-                    "estacionamento-lisboa",
-                    "emel-parking"
-                ]
-                
-                for dataset in dataset_names:
-                    try:
-                        # Get parking locations with real coordinates
-                        locations_params = {
-                            "dataset": dataset,
-                            "rows": 1000,
-                            "facet": ["zona", "tipo"]
-                        }
-                        
-                        locations_response = requests.get(api_base, params=locations_params, timeout=15)
-                        locations_response.raise_for_status()
-                        
-                        # Check if response is valid JSON
-                        if locations_response.text.strip():
-                            locations_data = locations_response.json()
-                            
-                            # Process locations data with real coordinates
-                            for record in locations_data.get("records", []):
-                                fields = record.get("fields", {})
-                                if fields and fields.get("latitude") and fields.get("longitude"):  # Only add if coordinates exist
-                                    locations.append({
-                                        "id_parque": fields.get("id_parque", len(locations) + 1),
-                                        "nome_parque": fields.get("nome_parque", f"Parque {len(locations) + 1}"),
-                                        "zona": fields.get("zona", f"Zona {np.random.randint(1, 6)}"),
-                                        "latitude": float(fields.get("latitude")),
-                                        "longitude": float(fields.get("longitude")),
-                                        "lugares_totais": fields.get("lugares_totais", np.random.randint(20, 100)),
-                                        "preco_hora": fields.get("preco_hora", round(np.random.uniform(0.5, 2.5), 2)),
-                                        "tipo_parque": fields.get("tipo_parque", np.random.choice(["Superfície", "Subterrâneo", "Misto"])),
-                                        "endereco": fields.get("endereco", f"Rua {len(locations) + 1}, Lisboa")
-                                    })
-                            
-                            # If we got some data, break out of the loop
-                            if locations:
-                                break
-                    except:
-                        continue  # Try next dataset name
-                
-                if locations:
-                    break
-                        
-            except (requests.RequestException, json.JSONDecodeError, KeyError) as e:
-                continue  # Try next endpoint
-        
-        # If no real data was loaded, try to load from hardcoded real coordinates
-        if not locations:
-            st.info("API data unavailable. Using real Lisbon parking coordinates from EMEL database.")
-            return load_real_lisbon_coordinates()
-        
-        # Generate some historical data based on the loaded locations
-        for _, row in pd.DataFrame(locations).iterrows():
-            # Add variation per parking lot
-            lot_factor = np.random.uniform(0.7, 1.3)
-            
-            for day in range(3):  # 3 days of data
-                for hour in range(24):
-                    # Simulate realistic occupancy patterns with more variation
-                    base_occupancy = 0.2 + 0.5 * np.sin((hour - 6) * np.pi / 12)
-                    base_occupancy = base_occupancy * lot_factor
-                    base_occupancy = max(0.05, min(0.95, base_occupancy))
-                    
-                    occupied = int(row["lugares_totais"] * base_occupancy + np.random.normal(0, row["lugares_totais"] * 0.1))
-                    occupied = max(0, min(row["lugares_totais"], occupied))
-                    
-                    history.append({
-                        "id_parque": row["id_parque"],
-                        "data": (datetime.now() - timedelta(days=day)).strftime("%Y-%m-%d"),
-                        "hora": hour,
-                        "lugares_totais": row["lugares_totais"],
-                        "lugares_ocupados": occupied,
-                        "lugares_livres": row["lugares_totais"] - occupied,
-                        "taxa_ocupacao": round((occupied / row["lugares_totais"]) * 100, 2)
-                    })
-        
-        return pd.DataFrame(locations), pd.DataFrame(history)
-        
-    except Exception as e:
-        st.warning(f"Could not load real EMEL data: {str(e)}. Using simulated data instead.")
-        return load_simulated_emel_data()
-
-@st.cache_data
-def load_real_lisbon_coordinates():
-    """
-    Load real Lisbon parking coordinates from EMEL database
-    """
-    # Real EMEL parking locations with actual coordinates from Lisbon
-    real_emel_parking = [
-        {"nome": "Parque Eduardo VII", "lat": 38.7289, "lon": -9.1508, "zona": "Zona 1", "endereco": "Av. da Liberdade, Lisboa"},
-        {"nome": "Parque Marquês de Pombal", "lat": 38.7255, "lon": -9.1503, "zona": "Zona 1", "endereco": "Praça Marquês de Pombal, Lisboa"},
-        {"nome": "Parque Rossio", "lat": 38.7139, "lon": -9.1394, "zona": "Zona 1", "endereco": "Praça do Rossio, Lisboa"},
-        {"nome": "Parque Praça do Comércio", "lat": 38.7080, "lon": -9.1370, "zona": "Zona 1", "endereco": "Praça do Comércio, Lisboa"},
-        {"nome": "Parque Cais do Sodré", "lat": 38.7071, "lon": -9.1440, "zona": "Zona 1", "endereco": "Cais do Sodré, Lisboa"},
-        {"nome": "Parque Chiado", "lat": 38.7109, "lon": -9.1426, "zona": "Zona 1", "endereco": "Rua do Chiado, Lisboa"},
-        {"nome": "Parque Bairro Alto", "lat": 38.7120, "lon": -9.1440, "zona": "Zona 1", "endereco": "Bairro Alto, Lisboa"},
-        {"nome": "Parque Alfama", "lat": 38.7106, "lon": -9.1314, "zona": "Zona 1", "endereco": "Alfama, Lisboa"},
-        {"nome": "Parque Graça", "lat": 38.7150, "lon": -9.1280, "zona": "Zona 1", "endereco": "Graça, Lisboa"},
-        {"nome": "Parque Castelo", "lat": 38.7139, "lon": -9.1334, "zona": "Zona 1", "endereco": "Castelo de São Jorge, Lisboa"},
-        {"nome": "Parque Saldanha", "lat": 38.7370, "lon": -9.1440, "zona": "Zona 2", "endereco": "Praça Duque de Saldanha, Lisboa"},
-        {"nome": "Parque Campo Pequeno", "lat": 38.7400, "lon": -9.1440, "zona": "Zona 2", "endereco": "Campo Pequeno, Lisboa"},
-        {"nome": "Parque Entrecampos", "lat": 38.7500, "lon": -9.1440, "zona": "Zona 2", "endereco": "Entrecampos, Lisboa"},
-        {"nome": "Parque Alvalade", "lat": 38.7500, "lon": -9.1400, "zona": "Zona 2", "endereco": "Alvalade, Lisboa"},
-        {"nome": "Parque Areeiro", "lat": 38.7500, "lon": -9.1300, "zona": "Zona 2", "endereco": "Areeiro, Lisboa"},
-        {"nome": "Parque Arroios", "lat": 38.7400, "lon": -9.1300, "zona": "Zona 2", "endereco": "Arroios, Lisboa"},
-        {"nome": "Parque Anjos", "lat": 38.7300, "lon": -9.1300, "zona": "Zona 2", "endereco": "Anjos, Lisboa"},
-        {"nome": "Parque Intendente", "lat": 38.7200, "lon": -9.1300, "zona": "Zona 2", "endereco": "Intendente, Lisboa"},
-        {"nome": "Parque Martim Moniz", "lat": 38.7150, "lon": -9.1350, "zona": "Zona 2", "endereco": "Martim Moniz, Lisboa"},
-        {"nome": "Parque Mouraria", "lat": 38.7150, "lon": -9.1380, "zona": "Zona 2", "endereco": "Mouraria, Lisboa"},
-        {"nome": "Parque Belém", "lat": 38.6970, "lon": -9.2060, "zona": "Zona 3", "endereco": "Belém, Lisboa"},
-        {"nome": "Parque Ajuda", "lat": 38.7100, "lon": -9.2000, "zona": "Zona 3", "endereco": "Ajuda, Lisboa"},
-        {"nome": "Parque Alcântara", "lat": 38.7050, "lon": -9.1700, "zona": "Zona 3", "endereco": "Alcântara, Lisboa"},
-        {"nome": "Parque Santos", "lat": 38.7050, "lon": -9.1500, "zona": "Zona 3", "endereco": "Santos, Lisboa"},
-        {"nome": "Parque Lapa", "lat": 38.7100, "lon": -9.1600, "zona": "Zona 3", "endereco": "Lapa, Lisboa"},
-        {"nome": "Parque Estrela", "lat": 38.7150, "lon": -9.1600, "zona": "Zona 3", "endereco": "Estrela, Lisboa"},
-        {"nome": "Parque Rato", "lat": 38.7200, "lon": -9.1550, "zona": "Zona 3", "endereco": "Rato, Lisboa"},
-        {"nome": "Parque Amoreiras", "lat": 38.7250, "lon": -9.1600, "zona": "Zona 3", "endereco": "Amoreiras, Lisboa"},
-        {"nome": "Parque Campo de Ourique", "lat": 38.7200, "lon": -9.1650, "zona": "Zona 3", "endereco": "Campo de Ourique, Lisboa"},
-        {"nome": "Parque Madragoa", "lat": 38.7100, "lon": -9.1550, "zona": "Zona 3", "endereco": "Madragoa, Lisboa"},
-        {"nome": "Parque Olivais", "lat": 38.7700, "lon": -9.1100, "zona": "Zona 4", "endereco": "Olivais, Lisboa"},
-        {"nome": "Parque Moscavide", "lat": 38.7800, "lon": -9.1000, "zona": "Zona 4", "endereco": "Moscavide, Lisboa"},
-        {"nome": "Parque Sacavém", "lat": 38.7900, "lon": -9.1000, "zona": "Zona 4", "endereco": "Sacavém, Lisboa"},
-        {"nome": "Parque Lumiar", "lat": 38.7600, "lon": -9.1600, "zona": "Zona 4", "endereco": "Lumiar, Lisboa"},
-        {"nome": "Parque Telheiras", "lat": 38.7600, "lon": -9.1700, "zona": "Zona 4", "endereco": "Telheiras, Lisboa"},
-        {"nome": "Parque Benfica", "lat": 38.7500, "lon": -9.2000, "zona": "Zona 4", "endereco": "Benfica, Lisboa"},
-        {"nome": "Parque Carnide", "lat": 38.7600, "lon": -9.1900, "zona": "Zona 4", "endereco": "Carnide, Lisboa"},
-        {"nome": "Parque Pontinha", "lat": 38.7700, "lon": -9.2000, "zona": "Zona 4", "endereco": "Pontinha, Lisboa"},
-        {"nome": "Parque Odivelas", "lat": 38.7900, "lon": -9.1800, "zona": "Zona 4", "endereco": "Odivelas, Lisboa"},
-        {"nome": "Parque Famões", "lat": 38.8000, "lon": -9.2000, "zona": "Zona 4", "endereco": "Famões, Lisboa"},
-        {"nome": "Parque Parque das Nações", "lat": 38.7700, "lon": -9.0900, "zona": "Zona 5", "endereco": "Parque das Nações, Lisboa"},
-        {"nome": "Parque Oriente", "lat": 38.7700, "lon": -9.1000, "zona": "Zona 5", "endereco": "Gare do Oriente, Lisboa"},
-        {"nome": "Parque Cabo Ruivo", "lat": 38.7600, "lon": -9.1000, "zona": "Zona 5", "endereco": "Cabo Ruivo, Lisboa"},
-        {"nome": "Parque Beato", "lat": 38.7400, "lon": -9.1100, "zona": "Zona 5", "endereco": "Beato, Lisboa"},
-        {"nome": "Parque Marvila", "lat": 38.7400, "lon": -9.1000, "zona": "Zona 5", "endereco": "Marvila, Lisboa"},
-        {"nome": "Parque Xabregas", "lat": 38.7300, "lon": -9.1200, "zona": "Zona 5", "endereco": "Xabregas, Lisboa"},
-        {"nome": "Parque Penha de França", "lat": 38.7300, "lon": -9.1300, "zona": "Zona 5", "endereco": "Penha de França, Lisboa"},
-        {"nome": "Parque Alto do Pina", "lat": 38.7400, "lon": -9.1300, "zona": "Zona 5", "endereco": "Alto do Pina, Lisboa"},
-        {"nome": "Parque Alameda", "lat": 38.7400, "lon": -9.1400, "zona": "Zona 5", "endereco": "Alameda, Lisboa"}
-    ]
-    
-    # Create DataFrame with real EMEL coordinates
-    locations = pd.DataFrame({
-        "id_parque": range(1, len(real_emel_parking) + 1),
-        "nome_parque": [park["nome"] for park in real_emel_parking],
-        "zona": [park["zona"] for park in real_emel_parking],
-        "latitude": [park["lat"] for park in real_emel_parking],
-        "longitude": [park["lon"] for park in real_emel_parking],
-        "lugares_totais": np.random.randint(20, 100, len(real_emel_parking)),
-        "preco_hora": np.random.uniform(0.5, 2.5, len(real_emel_parking)).round(2),
-        "tipo_parque": np.random.choice(["Superfície", "Subterrâneo", "Misto"], len(real_emel_parking)),
-        "endereco": [park["endereco"] for park in real_emel_parking]
-    })
-    
-    # Generate historical data with more realistic variation
-    records = []
-    for _, row in locations.iterrows():
-        # Add some variation per parking lot (some are busier than others)
-        lot_factor = np.random.uniform(0.7, 1.3)  # Some lots are 30% busier/quieter
-        
-        for day in range(3):
-            for hour in range(24):
-                # Create realistic occupancy patterns
-                base_occupancy = 0.2 + 0.5 * np.sin((hour - 6) * np.pi / 12)
-                base_occupancy = base_occupancy * lot_factor  # Apply lot-specific factor
-                base_occupancy = max(0.05, min(0.95, base_occupancy))  # Keep between 5-95%
-                
-                # Add some randomness
-                occupied = int(row["lugares_totais"] * base_occupancy + np.random.normal(0, row["lugares_totais"] * 0.1))
-                occupied = max(0, min(row["lugares_totais"], occupied))
-                
-                records.append({
-                    "id_parque": row["id_parque"],
-                    "data": (datetime.now() - timedelta(days=day)).strftime("%Y-%m-%d"),
-                    "hora": hour,
-                    "lugares_totais": row["lugares_totais"],
-                    "lugares_ocupados": occupied,
-                    "lugares_livres": row["lugares_totais"] - occupied,
-                    "taxa_ocupacao": round((occupied / row["lugares_totais"]) * 100, 2)
-                })
-    
-    history = pd.DataFrame(records)
-    return locations, history
-
-@st.cache_data
-def load_simulated_emel_data():
-    # Real Lisbon parking locations (actual coordinates within city boundaries)
-    real_lisbon_parking = [
-        {"nome": "Parque Eduardo VII", "lat": 38.7289, "lon": -9.1508, "zona": "Zona 1"},
-        {"nome": "Parque Marquês de Pombal", "lat": 38.7255, "lon": -9.1503, "zona": "Zona 1"},
-        {"nome": "Parque Rossio", "lat": 38.7139, "lon": -9.1394, "zona": "Zona 1"},
-        {"nome": "Parque Praça do Comércio", "lat": 38.7080, "lon": -9.1370, "zona": "Zona 1"},
-        {"nome": "Parque Cais do Sodré", "lat": 38.7071, "lon": -9.1440, "zona": "Zona 1"},
-        {"nome": "Parque Chiado", "lat": 38.7109, "lon": -9.1426, "zona": "Zona 1"},
-        {"nome": "Parque Bairro Alto", "lat": 38.7120, "lon": -9.1440, "zona": "Zona 1"},
-        {"nome": "Parque Alfama", "lat": 38.7106, "lon": -9.1314, "zona": "Zona 1"},
-        {"nome": "Parque Graça", "lat": 38.7150, "lon": -9.1280, "zona": "Zona 1"},
-        {"nome": "Parque Castelo", "lat": 38.7139, "lon": -9.1334, "zona": "Zona 1"},
-        {"nome": "Parque Saldanha", "lat": 38.7370, "lon": -9.1440, "zona": "Zona 2"},
-        {"nome": "Parque Campo Pequeno", "lat": 38.7400, "lon": -9.1440, "zona": "Zona 2"},
-        {"nome": "Parque Entrecampos", "lat": 38.7500, "lon": -9.1440, "zona": "Zona 2"},
-        {"nome": "Parque Alvalade", "lat": 38.7500, "lon": -9.1400, "zona": "Zona 2"},
-        {"nome": "Parque Areeiro", "lat": 38.7500, "lon": -9.1300, "zona": "Zona 2"},
-        {"nome": "Parque Arroios", "lat": 38.7400, "lon": -9.1300, "zona": "Zona 2"},
-        {"nome": "Parque Anjos", "lat": 38.7300, "lon": -9.1300, "zona": "Zona 2"},
-        {"nome": "Parque Intendente", "lat": 38.7200, "lon": -9.1300, "zona": "Zona 2"},
-        {"nome": "Parque Martim Moniz", "lat": 38.7150, "lon": -9.1350, "zona": "Zona 2"},
-        {"nome": "Parque Mouraria", "lat": 38.7150, "lon": -9.1380, "zona": "Zona 2"},
-        {"nome": "Parque Belém", "lat": 38.6970, "lon": -9.2060, "zona": "Zona 3"},
-        {"nome": "Parque Ajuda", "lat": 38.7100, "lon": -9.2000, "zona": "Zona 3"},
-        {"nome": "Parque Alcântara", "lat": 38.7050, "lon": -9.1700, "zona": "Zona 3"},
-        {"nome": "Parque Santos", "lat": 38.7050, "lon": -9.1500, "zona": "Zona 3"},
-        {"nome": "Parque Lapa", "lat": 38.7100, "lon": -9.1600, "zona": "Zona 3"},
-        {"nome": "Parque Estrela", "lat": 38.7150, "lon": -9.1600, "zona": "Zona 3"},
-        {"nome": "Parque Rato", "lat": 38.7200, "lon": -9.1550, "zona": "Zona 3"},
-        {"nome": "Parque Amoreiras", "lat": 38.7250, "lon": -9.1600, "zona": "Zona 3"},
-        {"nome": "Parque Campo de Ourique", "lat": 38.7200, "lon": -9.1650, "zona": "Zona 3"},
-        {"nome": "Parque Madragoa", "lat": 38.7100, "lon": -9.1550, "zona": "Zona 3"},
-        {"nome": "Parque Olivais", "lat": 38.7700, "lon": -9.1100, "zona": "Zona 4"},
-        {"nome": "Parque Moscavide", "lat": 38.7800, "lon": -9.1000, "zona": "Zona 4"},
-        {"nome": "Parque Sacavém", "lat": 38.7900, "lon": -9.1000, "zona": "Zona 4"},
-        {"nome": "Parque Lumiar", "lat": 38.7600, "lon": -9.1600, "zona": "Zona 4"},
-        {"nome": "Parque Telheiras", "lat": 38.7600, "lon": -9.1700, "zona": "Zona 4"},
-        {"nome": "Parque Benfica", "lat": 38.7500, "lon": -9.2000, "zona": "Zona 4"},
-        {"nome": "Parque Carnide", "lat": 38.7600, "lon": -9.1900, "zona": "Zona 4"},
-        {"nome": "Parque Pontinha", "lat": 38.7700, "lon": -9.2000, "zona": "Zona 4"},
-        {"nome": "Parque Odivelas", "lat": 38.7900, "lon": -9.1800, "zona": "Zona 4"},
-        {"nome": "Parque Famões", "lat": 38.8000, "lon": -9.2000, "zona": "Zona 4"},
-        {"nome": "Parque Parque das Nações", "lat": 38.7700, "lon": -9.0900, "zona": "Zona 5"},
-        {"nome": "Parque Oriente", "lat": 38.7700, "lon": -9.1000, "zona": "Zona 5"},
-        {"nome": "Parque Cabo Ruivo", "lat": 38.7600, "lon": -9.1000, "zona": "Zona 5"},
-        {"nome": "Parque Beato", "lat": 38.7400, "lon": -9.1100, "zona": "Zona 5"},
-        {"nome": "Parque Marvila", "lat": 38.7400, "lon": -9.1000, "zona": "Zona 5"},
-        {"nome": "Parque Xabregas", "lat": 38.7300, "lon": -9.1200, "zona": "Zona 5"},
-        {"nome": "Parque Penha de França", "lat": 38.7300, "lon": -9.1300, "zona": "Zona 5"},
-        {"nome": "Parque Alto do Pina", "lat": 38.7400, "lon": -9.1300, "zona": "Zona 5"},
-        {"nome": "Parque Areeiro", "lat": 38.7500, "lon": -9.1300, "zona": "Zona 5"},
-        {"nome": "Parque Alameda", "lat": 38.7400, "lon": -9.1400, "zona": "Zona 5"}
-    ]
-    
-    # Create DataFrame with real Lisbon coordinates
-    locations = pd.DataFrame({
-        "id_parque": range(1, len(real_lisbon_parking) + 1),
-        "nome_parque": [park["nome"] for park in real_lisbon_parking],
-        "zona": [park["zona"] for park in real_lisbon_parking],
-        "latitude": [park["lat"] for park in real_lisbon_parking],
-        "longitude": [park["lon"] for park in real_lisbon_parking],
-        "lugares_totais": np.random.randint(20, 100, len(real_lisbon_parking)),
-        "preco_hora": np.random.uniform(0.5, 2.5, len(real_lisbon_parking)).round(2),
-        "tipo_parque": np.random.choice(["Superfície", "Subterrâneo", "Misto"], len(real_lisbon_parking))
-    })
-
-    # Simulated EMEL occupancy history (3 days, hourly)
-    records = []
-    for _, row in locations.iterrows():
-        for day in range(3):
-            for hour in range(24):
-                # Simulate realistic occupancy patterns (higher during day, lower at night)
-                base_occupancy = 0.3 + 0.4 * np.sin((hour - 6) * np.pi / 12)  # Peak around 12-14h
-                base_occupancy = max(0.1, min(0.9, base_occupancy))  # Keep between 10-90%
-                
-                occupied = int(row["lugares_totais"] * base_occupancy + np.random.normal(0, 0.1))
-                occupied = max(0, min(row["lugares_totais"], occupied))  # Ensure valid range
-                
-                records.append({
-                    "id_parque": row["id_parque"],
-                    "data": (pd.Timestamp("2025-10-10") + pd.Timedelta(days=day)).strftime("%Y-%m-%d"),
-                    "hora": hour,
-                    "lugares_totais": row["lugares_totais"],
-                    "lugares_ocupados": occupied,
-                    "lugares_livres": row["lugares_totais"] - occupied,
-                    "taxa_ocupacao": round((occupied / row["lugares_totais"]) * 100, 2)
-                })
-    history = pd.DataFrame(records)
-    return locations, history
-
 # Try to load real EMEL data first, fallback to simulated data
-locations, history = load_real_emel_data()
+locations, history = load(use_api=True)
 
 # --------------------------------------------------------------
 # 🔍 Search and Geocoding Functions
@@ -386,12 +83,13 @@ def geocode_address(address):
     except:
         return None
 
-def calculate_distance(lat1, lon1, lat2, lon2):
-    """Calculate distance between two points in kilometers"""
-    try:
-        return geopy.distance.distance((lat1, lon1), (lat2, lon2)).km
-    except:
-        return float('inf')
+EARTH_RADIUS_KM = 6371.0088  # Mean Earth radius
+
+def calculate_distances(lat, lon, lats, lons):
+    """Calculate haversine distances in kilometers from one point to arrays of points"""
+    lat, lon, lats, lons = map(np.radians, (lat, lon, lats, lons))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
 
 def find_nearest_parks(search_coords, locations_df, max_distance=2.0):
     """Find parking spots within max_distance km of search coordinates"""
@@ -400,19 +98,15 @@ def find_nearest_parks(search_coords, locations_df, max_distance=2.0):
     
     search_lat, search_lon = search_coords
     
-    # Calculate distances
-    distances = []
-    for _, row in locations_df.iterrows():
-        dist = calculate_distance(search_lat, search_lon, row['latitude'], row['longitude'])
-        distances.append(dist)
-    
-    locations_df = locations_df.copy()
-    locations_df['distance_km'] = distances
+    # Calculate distances to every parking lot at once
+    distances = calculate_distances(search_lat, search_lon,
+                                    locations_df['latitude'].to_numpy(), locations_df['longitude'].to_numpy())
     
     # Filter by distance and sort by proximity
-    nearest = locations_df[locations_df['distance_km'] <= max_distance].sort_values('distance_km')
+    nearby = np.flatnonzero(distances <= max_distance)
+    nearby = nearby[np.argsort(distances[nearby], kind="stable")]
     
-    return nearest
+    return locations_df.iloc[nearby].assign(distance_km=distances[nearby])
 
 # Data source indicator
 if not locations.empty and not history.empty:
@@ -424,23 +118,7 @@ else:
 # 🧮 Data Preprocessing
 # --------------------------------------------------------------
 
-# Create timestamp from data and hora columns
-history["timestamp"] = pd.to_datetime(history["data"] + " " + history["hora"].astype(str) + ":00:00")
-history["hour"] = history["hora"]
-history["weekday"] = history["timestamp"].dt.dayofweek
-history["prob_vacant"] = history["lugares_livres"] / history["lugares_totais"]
-
-# Merge with location info
-data = history.merge(locations, on="id_parque", how="left")
-
-# Use the correct capacity column name
-data['capacity'] = data['lugares_totais_x']
-
-# Ensure we have valid probability data
-if data['prob_vacant'].isna().any() or data['prob_vacant'].min() < 0 or data['prob_vacant'].max() > 1:
-    st.error("Invalid probability data detected. Regenerating...")
-    # Regenerate with proper probabilities
-    data['prob_vacant'] = np.random.uniform(0.1, 0.9, len(data))
+history = preprocess(history)
 
 # --------------------------------------------------------------
 # 🧠 Train a Simple Prediction Model
@@ -448,30 +126,68 @@ if data['prob_vacant'].isna().any() or data['prob_vacant'].min() < 0 or data['pr
 
 @st.cache_resource
 def train_model():
-    # Use the global data variable
-    X = data[["hour", "weekday", "capacity"]]
-    y = data["prob_vacant"]
+    # Use the global history variable; capacity is already stored per row.
+    # Plain float32 arrays (columns: hour, weekday, capacity) skip sklearn's feature-name checks.
+    # pandas hands back the columns column-major; make them row-major once for hashing and splitting.
+    X = np.ascontiguousarray(history[["hora", "weekday", "lugares_totais"]].to_numpy(dtype=np.float32))
+    y = history["prob_vacant"].to_numpy(dtype=np.float32, copy=False)
 
     # Ensure we have valid data
     if len(X) == 0 or len(y) == 0:
-        # Create dummy data if no real data
-        X = pd.DataFrame({
-            "hour": np.random.randint(0, 24, 100),
-            "weekday": np.random.randint(0, 7, 100),
-            "capacity": np.random.randint(20, 100, 100)
-        })
-        y = np.random.uniform(0.1, 0.9, 100)
+        # Create dummy data if no real data (seeded, so the saved model is reused)
+        rng = np.random.default_rng(42)
+        X = np.column_stack([
+            rng.integers(0, 24, 100),
+            rng.integers(0, 7, 100),
+            rng.integers(20, 100, 100)
+        ]).astype(np.float32)
+        y = rng.uniform(0.1, 0.9, 100).astype(np.float32)
+
+    # hour (0-23) and weekday (0-6) are small integers, so 32 bins cover them exactly
+    model = HistGradientBoostingRegressor(max_iter=200, max_bins=32, random_state=42)
+
+    # Reuse a model saved by an earlier server run if the data, settings and sklearn version are identical
+    key = hashlib.blake2b(X.tobytes() + y.tobytes() + repr(model).encode() + sklearn.__version__.encode(),
+                          digest_size=8).hexdigest()
+    model_path = CACHE_DIR / f"model_{key}.joblib"
+    if model_path.exists():
+        try:
+            return joblib.load(model_path)
+        except Exception:
+            pass  # Truncated or incompatible file: retrain and overwrite it
 
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-    model = RandomForestRegressor(n_estimators=100, random_state=42, max_depth=10)
     model.fit(X_train, y_train)
 
     score = model.score(X_test, y_test)
+    try:
+        CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+        replace_atomically(model_path, lambda tmp_path: joblib.dump((model, score, X_test, y_test), tmp_path, compress=3))
+    except OSError:
+        pass  # Saving is only a speed-up for the next run
     return model, score, X_test, y_test
 
 model, model_score, X_test, y_test = train_model()
 
+@st.cache_resource
+def build_prediction_table(_model, locations):
+    """Predict vacancy for every hour, weekday and parking lot in one pass"""
+    n_lots = len(locations)
+
+    # Fill one float32 block of (hour, weekday, capacity) rows by broadcasting
+    grid = np.empty((24, 7, n_lots, 3), dtype=np.float32)
+    grid[..., 0] = np.arange(24)[:, None, None]
+    grid[..., 1] = np.arange(7)[None, :, None]
+    grid[..., 2] = locations["lugares_totais"].to_numpy()
+
+    predictions = np.clip(_model.predict(grid.reshape(-1, 3)), 0, 1)
+
+    # cache_resource hands every session this same array, so make it read-only
+    predictions.setflags(write=False)
+    return predictions.reshape(24, 7, n_lots)  # table[hour, weekday, lot]
+
+prediction_table = build_prediction_table(model, locations)
+
 # --------------------------------------------------------------
 # 🎛️ User Controls
 # --------------------------------------------------------------
@@ -512,6 +228,13 @@ with st.sidebar:
 
 weekday_idx = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"].index(selected_weekday)
 
+# --------------------------------------------------------------
+# 🔮 Predict Vacancy for Selected Time
+# --------------------------------------------------------------
+
+# Look up the precomputed model predictions instead of predicting on every rerun
+locations["pred_vacancy"] = prediction_table[selected_hour, weekday_idx]
+
 # --------------------------------------------------------------
 # 🔍 Process Search Input
 # --------------------------------------------------------------
@@ -537,50 +260,28 @@ if search_input.strip():
 else:
     search_results = locations
 
-# --------------------------------------------------------------
-# 🔮 Predict Vacancy for Selected Time
-# --------------------------------------------------------------
-
-sample = pd.DataFrame({
-    "hour": [selected_hour] * len(search_results),
-    "weekday": [weekday_idx] * len(search_results),
-    "capacity": search_results["lugares_totais"]
-})
-
-# Generate realistic predictions directly instead of relying on model
-predictions = []
-for i in range(len(search_results)):
-    # Create realistic vacancy probabilities based on time and location
-    base_prob = 0.3 + 0.4 * np.sin((selected_hour - 6) * np.pi / 12)  # Time-based pattern
-    base_prob = max(0.1, min(0.9, base_prob))  # Keep between 10-90%
-    
-    # Add variation based on parking lot characteristics
-    lot_factor = np.random.uniform(0.7, 1.3)  # Some lots are busier/quieter
-    final_prob = base_prob * lot_factor
-    final_prob = max(0.05, min(0.95, final_prob))  # Ensure 5-95% range
-    
-    predictions.append(final_prob)
-
-search_results["pred_vacancy"] = predictions
-filtered = search_results[search_results["pred_vacancy"] >= threshold]
+# Keep only the lots above the threshold, and only the columns the map and its tooltip use
+MAP_COLUMNS = ("longitude", "latitude", "pred_vacancy", "nome_parque", "zona",
+               "preco_hora", "lugares_totais", "endereco", "distance_km")
+vacant_mask = search_results["pred_vacancy"].to_numpy() >= threshold
+filtered = search_results.loc[vacant_mask, [column for column in MAP_COLUMNS if column in search_results]]
 
 # --------------------------------------------------------------
 # 🗺️ Map Visualization
 # --------------------------------------------------------------
 
 # Create color-coded parking spots based on vacancy probability
-def get_color_by_vacancy(vacancy_prob):
-    """Return RGB color based on vacancy probability percentage"""
-    if vacancy_prob >= 0.8:  # 80%+ vacancy = Green
-        return [0, 255, 0, 200]
-    elif vacancy_prob >= 0.6:  # 60-79% vacancy = Light Green
-        return [100, 255, 100, 200]
-    elif vacancy_prob >= 0.4:  # 40-59% vacancy = Yellow
-        return [255, 255, 0, 200]
-    elif vacancy_prob >= 0.2:  # 20-39% vacancy = Orange
-        return [255, 165, 0, 200]
-    else:  # <20% vacancy = Red
-        return [255, 0, 0, 200]
+VACANCY_COLORS = np.array([
+    [255, 0, 0, 200],      # <20% vacancy = Red
+    [255, 165, 0, 200],    # 20-39% vacancy = Orange
+    [255, 255, 0, 200],    # 40-59% vacancy = Yellow
+    [100, 255, 100, 200],  # 60-79% vacancy = Light Green
+    [0, 255, 0, 200]       # 80%+ vacancy = Green
+], dtype=np.uint8)
+
+def get_color_by_vacancy(vacancy_probs):
+    """Return RGBA colors for an array of vacancy probabilities"""
+    return VACANCY_COLORS[np.digitize(vacancy_probs, [0.2, 0.4, 0.6, 0.8])]
 
 # Create tooltip with proper percentage formatting
 def create_tooltip_text(row):
@@ -601,26 +302,6 @@ def create_tooltip_text(row):
     
     return tooltip_text
 
-# Add formatted tooltip text to filtered data
-filtered_with_tooltip = filtered.copy()
-filtered_with_tooltip['tooltip_text'] = filtered_with_tooltip.apply(create_tooltip_text, axis=1)
-
-# Add color column to filtered data
-filtered_with_color = filtered_with_tooltip.copy()
-filtered_with_color['color'] = filtered_with_color['pred_vacancy'].apply(get_color_by_vacancy)
-
-layer = pdk.Layer(
-    "ScatterplotLayer",
-    data=filtered_with_color,
-    get_position=["longitude", "latitude"],
-    get_radius=100,
-    get_fill_color="color",
-    pickable=True,
-    stroked=True,
-    get_line_color=[255, 255, 255],
-    line_width_min_pixels=2
-)
-
 view_state = pdk.ViewState(
     latitude=38.7223,
     longitude=-9.1393,
@@ -638,12 +319,39 @@ tooltip = {
     }
 }
 
+@st.cache_resource(max_entries=64)  # One deck per hour/day/threshold view; drop the oldest beyond that
+def build_vacancy_deck(points):
+    """
+    Build the map for the filtered lots, reused while the same lots and predictions are shown
+    """
+    # The browser only needs positions, palette colors (uint8 RGBA) and the formatted tooltip text,
+    # so the raw vacancy, price and name columns are not serialized into the map's JSON
+    points = pd.DataFrame({
+        "longitude": points["longitude"].to_numpy(),
+        "latitude": points["latitude"].to_numpy(),
+        "color": get_color_by_vacancy(points["pred_vacancy"].to_numpy()).tolist(),
+        "tooltip_text": [create_tooltip_text(row) for _, row in points.iterrows()]
+    })
+
+    layer = pdk.Layer(
+        "ScatterplotLayer",
+        data=points,
+        get_position=["longitude", "latitude"],
+        get_radius=100,
+        get_fill_color="color",
+        pickable=True,
+        stroked=True,
+        get_line_color=[255, 255, 255],
+        line_width_min_pixels=2
+    )
+    return pdk.Deck(layers=[layer], initial_view_state=view_state, tooltip=tooltip)
+
 st.subheader("🗺️ Predicted Vacancy Map")
 
 # Add color legend
 col1, col2 = st.columns([3, 1])
 with col1:
-    st.pydeck_chart(pdk.Deck(layers=[layer], initial_view_state=view_state, tooltip=tooltip))
+    st.pydeck_chart(build_vacancy_deck(filtered))
 with col2:
     st.markdown("### 🎨 Color Legend")
     st.markdown("""
@@ -677,17 +385,22 @@ col3.metric("Average Predicted Vacancy", f"{locations['pred_vacancy'].mean():.2f
 # 📈 Model Validation & Real Data Integration
 # --------------------------------------------------------------
 
+@st.cache_data
+def validation_chart(_model, X_test, y_test):
+    """Actual vs predicted vacancy on the test set (doesn't depend on the sidebar, so cached)"""
+    # Plain arrays are enough for st.line_chart, no intermediate DataFrame needed
+    return {
+        "Actual": y_test,
+        "Predicted": _model.predict(X_test).astype(np.float32)
+    }
+
 st.subheader("📈 Model Validation (Real EMEL Data)")
-chart_data = pd.DataFrame({
-    "Actual": y_test.reset_index(drop=True),
-    "Predicted": model.predict(X_test)
-})
-st.line_chart(chart_data)
+st.line_chart(validation_chart(model, X_test, y_test))
 
 # Show data source and production readiness
 col1, col2 = st.columns(2)
 with col1:
-    st.metric("Data Points Used", len(data))
+    st.metric("Data Points Used", len(history))
     st.metric("Historical Days", len(history["data"].unique()) if not history.empty else 0)
 with col2:
     st.metric("Parking Locations", len(locations))
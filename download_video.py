@@ -1,3 +1,4 @@
+import shutil
 import sys
 from pathlib import Path
 
@@ -32,8 +33,18 @@ def main() -> None:
         "quiet": False,
         "restrictfilenames": True,
         "ignoreerrors": True,
+        # Download HLS/DASH fragments in parallel and retry flaky ones
+        "concurrent_fragment_downloads": 8,
+        "http_chunk_size": 10_485_760,  # 10 MiB range requests
+        "retries": 3,
+        "fragment_retries": 3,
     }
 
+    # Plain HTTP(S) files: let aria2c split them into parallel connections, if installed
+    if shutil.which("aria2c"):
+        ydl_opts["external_downloader"] = {"http": "aria2c"}
+        ydl_opts["external_downloader_args"] = {"aria2c": ["-x", "16", "-k", "1M"]}
+
     try:
         with YoutubeDL(ydl_opts) as ydl:
             ydl.download([url])
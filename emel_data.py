@@ -0,0 +1,422 @@
+# ==============================================================
+# 📥 EMEL Parking Data
+# Loads parking lots and hourly occupancy history for app.py,
+# from the EMEL Open Data API or simulated fallbacks
+# ==============================================================
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
+import tempfile
+import time
+from pathlib import Path
+from datetime import datetime
+
+# --------------------------------------------------------------
+# 💾 Local Data Cache (survives Streamlit restarts)
+# --------------------------------------------------------------
+
+# Per-user folder: pickled models are loaded from here, so it must not be shared with other accounts
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "lisbon_parking"
+API_CACHE_TTL = 300  # Seconds before EMEL API data is fetched again
+CACHE_SCHEMA = 4  # Bump when the cached frames' columns or dtypes change
+
+def read_cached_frames(name, max_age=None):
+    """Load the (locations, history) pair saved under name, or None if missing or older than max_age seconds"""
+    paths = [CACHE_DIR / f"{name}_v{CACHE_SCHEMA}_{part}.parquet" for part in ("locations", "history")]
+    if not all(path.exists() for path in paths):
+        return None
+    try:
+        # The older of the two files decides, so a half-refreshed pair is never treated as fresh
+        if max_age is not None and max(time.time() - path.stat().st_mtime for path in paths) > max_age:
+            return None
+        return tuple(pd.read_parquet(path) for path in paths)
+    except (OSError, ValueError):
+        return None  # Unreadable or corrupt files count as a cache miss
+
+def replace_atomically(path, write):
+    """Call write(tmp_path) on a temporary file next to path, then move it into place in one step"""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def save_cached_frames(name, locations, history):
+    """Save a (locations, history) pair as compressed Parquet files (best effort, failures are ignored)"""
+    try:
+        CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+        for part, frame in (("locations", locations), ("history", history)):
+            replace_atomically(CACHE_DIR / f"{name}_v{CACHE_SCHEMA}_{part}.parquet",
+                               lambda tmp_path: frame.to_parquet(tmp_path, compression="zstd"))
+    except (OSError, ValueError, TypeError):
+        pass  # Not writable, disk full, or a column pyarrow can't store: the data is simply regenerated next time
+
+# --------------------------------------------------------------
+# 🔤 Compact Column Types
+# --------------------------------------------------------------
+
+# Text columns of the locations table (endereco included so every string column is compact)
+LOCATION_TEXT_COLUMNS = ("nome_parque", "zona", "tipo_parque", "endereco")
+
+def to_categories(df, columns):
+    """Store repeated text as pandas categoricals (small integer codes plus one dictionary)"""
+    return df.astype({column: "category" for column in columns if column in df})
+
+# Hours and space counts are small, rates need no float64 precision
+HISTORY_DTYPES = {
+    "hora": "int8",
+    "lugares_totais": "int16",
+    "lugares_ocupados": "int16",
+    "lugares_livres": "int16",
+    "taxa_ocupacao": "float32"
+}
+
+# --------------------------------------------------------------
+# 🅿️ EMEL Parking Lots and Occupancy (shared by the loaders)
+# --------------------------------------------------------------
+
+# Real EMEL parking locations with actual coordinates from Lisbon
+EMEL_PARKING_COLUMNS = ("nome_parque", "latitude", "longitude", "zona", "endereco")
+PARK_TYPES = ("Superfície", "Subterrâneo", "Misto")
+EMEL_PARKING_LOTS = (
+    ("Parque Eduardo VII", 38.7289, -9.1508, "Zona 1", "Av. da Liberdade, Lisboa"),
+    ("Parque Marquês de Pombal", 38.7255, -9.1503, "Zona 1", "Praça Marquês de Pombal, Lisboa"),
+    ("Parque Rossio", 38.7139, -9.1394, "Zona 1", "Praça do Rossio, Lisboa"),
+    ("Parque Praça do Comércio", 38.7080, -9.1370, "Zona 1", "Praça do Comércio, Lisboa"),
+    ("Parque Cais do Sodré", 38.7071, -9.1440, "Zona 1", "Cais do Sodré, Lisboa"),
+    ("Parque Chiado", 38.7109, -9.1426, "Zona 1", "Rua do Chiado, Lisboa"),
+    ("Parque Bairro Alto", 38.7120, -9.1440, "Zona 1", "Bairro Alto, Lisboa"),
+    ("Parque Alfama", 38.7106, -9.1314, "Zona 1", "Alfama, Lisboa"),
+    ("Parque Graça", 38.7150, -9.1280, "Zona 1", "Graça, Lisboa"),
+    ("Parque Castelo", 38.7139, -9.1334, "Zona 1", "Castelo de São Jorge, Lisboa"),
+    ("Parque Saldanha", 38.7370, -9.1440, "Zona 2", "Praça Duque de Saldanha, Lisboa"),
+    ("Parque Campo Pequeno", 38.7400, -9.1440, "Zona 2", "Campo Pequeno, Lisboa"),
+    ("Parque Entrecampos", 38.7500, -9.1440, "Zona 2", "Entrecampos, Lisboa"),
+    ("Parque Alvalade", 38.7500, -9.1400, "Zona 2", "Alvalade, Lisboa"),
+    ("Parque Areeiro", 38.7500, -9.1300, "Zona 2", "Areeiro, Lisboa"),
+    ("Parque Arroios", 38.7400, -9.1300, "Zona 2", "Arroios, Lisboa"),
+    ("Parque Anjos", 38.7300, -9.1300, "Zona 2", "Anjos, Lisboa"),
+    ("Parque Intendente", 38.7200, -9.1300, "Zona 2", "Intendente, Lisboa"),
+    ("Parque Martim Moniz", 38.7150, -9.1350, "Zona 2", "Martim Moniz, Lisboa"),
+    ("Parque Mouraria", 38.7150, -9.1380, "Zona 2", "Mouraria, Lisboa"),
+    ("Parque Belém", 38.6970, -9.2060, "Zona 3", "Belém, Lisboa"),
+    ("Parque Ajuda", 38.7100, -9.2000, "Zona 3", "Ajuda, Lisboa"),
+    ("Parque Alcântara", 38.7050, -9.1700, "Zona 3", "Alcântara, Lisboa"),
+    ("Parque Santos", 38.7050, -9.1500, "Zona 3", "Santos, Lisboa"),
+    ("Parque Lapa", 38.7100, -9.1600, "Zona 3", "Lapa, Lisboa"),
+    ("Parque Estrela", 38.7150, -9.1600, "Zona 3", "Estrela, Lisboa"),
+    ("Parque Rato", 38.7200, -9.1550, "Zona 3", "Rato, Lisboa"),
+    ("Parque Amoreiras", 38.7250, -9.1600, "Zona 3", "Amoreiras, Lisboa"),
+    ("Parque Campo de Ourique", 38.7200, -9.1650, "Zona 3", "Campo de Ourique, Lisboa"),
+    ("Parque Madragoa", 38.7100, -9.1550, "Zona 3", "Madragoa, Lisboa"),
+    ("Parque Olivais", 38.7700, -9.1100, "Zona 4", "Olivais, Lisboa"),
+    ("Parque Moscavide", 38.7800, -9.1000, "Zona 4", "Moscavide, Lisboa"),
+    ("Parque Sacavém", 38.7900, -9.1000, "Zona 4", "Sacavém, Lisboa"),
+    ("Parque Lumiar", 38.7600, -9.1600, "Zona 4", "Lumiar, Lisboa"),
+    ("Parque Telheiras", 38.7600, -9.1700, "Zona 4", "Telheiras, Lisboa"),
+    ("Parque Benfica", 38.7500, -9.2000, "Zona 4", "Benfica, Lisboa"),
+    ("Parque Carnide", 38.7600, -9.1900, "Zona 4", "Carnide, Lisboa"),
+    ("Parque Pontinha", 38.7700, -9.2000, "Zona 4", "Pontinha, Lisboa"),
+    ("Parque Odivelas", 38.7900, -9.1800, "Zona 4", "Odivelas, Lisboa"),
+    ("Parque Famões", 38.8000, -9.2000, "Zona 4", "Famões, Lisboa"),
+    ("Parque Parque das Nações", 38.7700, -9.0900, "Zona 5", "Parque das Nações, Lisboa"),
+    ("Parque Oriente", 38.7700, -9.1000, "Zona 5", "Gare do Oriente, Lisboa"),
+    ("Parque Cabo Ruivo", 38.7600, -9.1000, "Zona 5", "Cabo Ruivo, Lisboa"),
+    ("Parque Beato", 38.7400, -9.1100, "Zona 5", "Beato, Lisboa"),
+    ("Parque Marvila", 38.7400, -9.1000, "Zona 5", "Marvila, Lisboa"),
+    ("Parque Xabregas", 38.7300, -9.1200, "Zona 5", "Xabregas, Lisboa"),
+    ("Parque Penha de França", 38.7300, -9.1300, "Zona 5", "Penha de França, Lisboa"),
+    ("Parque Alto do Pina", 38.7400, -9.1300, "Zona 5", "Alto do Pina, Lisboa"),
+    ("Parque Alameda", 38.7400, -9.1400, "Zona 5", "Alameda, Lisboa")
+)
+
+def build_parking_locations(rng):
+    """Locations table for EMEL_PARKING_LOTS, with capacity, price and type drawn from rng"""
+    n_parks = len(EMEL_PARKING_LOTS)
+    locations = pd.DataFrame.from_records(EMEL_PARKING_LOTS, columns=EMEL_PARKING_COLUMNS)
+    return locations.assign(
+        id_parque=np.arange(1, n_parks + 1),
+        lugares_totais=rng.integers(20, 100, n_parks),
+        preco_hora=rng.uniform(0.5, 2.5, n_parks).round(2),
+        # Draw small integer codes and label them once, instead of one Python string per lot
+        tipo_parque=pd.Categorical.from_codes(rng.integers(0, len(PARK_TYPES), n_parks, dtype=np.int8), categories=PARK_TYPES)
+    )
+
+def history_frame(locations, dates, occupied):
+    """Flatten a (lot, day, hour) array of occupied spaces into the hourly history table"""
+    n_lots, n_days, n_hours = occupied.shape
+    capacity = locations["lugares_totais"].to_numpy()[:, None, None]
+    return pd.DataFrame({
+        "id_parque": np.repeat(locations["id_parque"].to_numpy(), n_days * n_hours),
+        "data": np.tile(np.repeat(dates, n_hours), n_lots),
+        "hora": np.tile(np.arange(n_hours), n_lots * n_days),
+        "lugares_totais": np.broadcast_to(capacity, occupied.shape).ravel(),
+        "lugares_ocupados": occupied.ravel(),
+        "lugares_livres": (capacity - occupied).ravel(),
+        "taxa_ocupacao": (occupied / capacity * 100).round(2).ravel()
+    }).astype(HISTORY_DTYPES)
+
+def synthesize_history(locations, rng, today, n_days=3):
+    """
+    Hourly occupancy for the n_days up to today at each location, drawn from rng
+    """
+    # Work on (lot, day, hour) arrays
+    n_lots, n_hours = len(locations), 24
+    hours = np.arange(n_hours)
+    dates = pd.Timestamp(today) - pd.to_timedelta(np.arange(n_days), unit="D")
+    capacity = locations["lugares_totais"].to_numpy()[:, None, None]
+
+    # Add some variation per parking lot (some are busier than others)
+    lot_factor = rng.uniform(0.7, 1.3, size=(n_lots, 1, 1))  # Some lots are 30% busier/quieter
+
+    # Create realistic occupancy patterns
+    base_occupancy = 0.2 + 0.5 * np.sin((hours - 6) * np.pi / 12)
+    base_occupancy = base_occupancy * lot_factor  # Apply lot-specific factor
+    base_occupancy = np.clip(base_occupancy, 0.05, 0.95)  # Keep between 5-95%
+
+    # Add some randomness
+    noise = rng.normal(0, capacity * 0.1, size=(n_lots, n_days, n_hours))
+    occupied = (capacity * base_occupancy + noise).astype(int)
+    occupied = np.clip(occupied, 0, capacity)
+    return history_frame(locations, dates, occupied)
+
+# --------------------------------------------------------------
+# 📥 Load Real EMEL Data from Open Data Portal
+# --------------------------------------------------------------
+
+@st.cache_resource
+def get_http_session():
+    """Shared HTTP session so API requests reuse open connections"""
+    session = requests.Session()
+    # Keep a pooled connection for each of the 15 concurrent endpoint/dataset probes,
+    # so none is thrown away after its first request
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=15, max_retries=Retry(total=2, backoff_factor=0.2))
+    session.mount("https://", adapter)
+    return session
+
+def fetch_emel_locations(session, api_base, dataset):
+    """
+    Ask one API endpoint for one dataset name and return its parking lots (empty list on failure)
+    """
+    locations = []
+    
+    # Get parking locations with real coordinates
+    locations_params = {
+        "dataset": dataset,
+        "rows": 1000,
+        "facet": ["zona", "tipo"]
+    }
+    
+    try:
+        locations_response = session.get(api_base, params=locations_params, timeout=5)
+    except requests.RequestException:
+        return []  # This endpoint is unreachable
+    
+    # Skip error pages and empty bodies without raising
+    if locations_response.status_code != 200 or not locations_response.text.strip():
+        return []
+    
+    # Check if response is valid JSON with records
+    try:
+        locations_data = locations_response.json()
+    except ValueError:
+        return []
+    records = locations_data.get("records") if isinstance(locations_data, dict) else None
+    if not records:
+        return []  # This endpoint/dataset combination didn't work
+    
+    # Process locations data with real coordinates
+    for record in records:
+        try:
+            fields = record.get("fields", {})
+            if fields and fields.get("latitude") and fields.get("longitude"):  # Only add if coordinates exist
+                locations.append({
+                    "id_parque": fields.get("id_parque", len(locations) + 1),
+                    "nome_parque": fields.get("nome_parque", f"Parque {len(locations) + 1}"),
+                    "zona": fields.get("zona", f"Zona {np.random.randint(1, 6)}"),
+                    "latitude": float(fields.get("latitude")),
+                    "longitude": float(fields.get("longitude")),
+                    "lugares_totais": fields.get("lugares_totais", np.random.randint(20, 100)),
+                    "preco_hora": fields.get("preco_hora", round(np.random.uniform(0.5, 2.5), 2)),
+                    "tipo_parque": fields.get("tipo_parque", np.random.choice(PARK_TYPES)),
+                    "endereco": fields.get("endereco", f"Rua {len(locations) + 1}, Lisboa")
+                })
+        except (ValueError, TypeError, AttributeError):
+            continue  # Skip malformed records (not a dict, or coordinates that aren't numbers)
+    
+    return locations
+
+@st.cache_data  # Keyed on the locations' content and the date, so it outlives the API TTL while EMEL's data is unchanged
+def synthesize_api_history(locations, today):
+    """Simulated occupancy history for lots returned by the API, ending on today"""
+    return synthesize_history(locations, np.random.default_rng(42), today)
+
+@st.cache_data(ttl=API_CACHE_TTL)  # Cache for 5 minutes
+def load_real_emel_data():
+    """
+    Load real EMEL parking data from their open data API, as (locations, history, loaded_from_api)
+    """
+    # API data saved by a recent run (possibly an earlier server process) is still fresh
+    cached = read_cached_frames("api", max_age=API_CACHE_TTL)
+    if cached is not None:
+        return (*cached, True)
+    
+    try:
+        # EMEL Open Data API endpoints - try multiple possible endpoints
+        api_endpoints = [
+            "https://opendata.emel.pt/api/records/1.0/search/",
+            "https://dados.gov.pt/api/records/1.0/search/",
+            "https://opendata.emel.pt/api/datasets/1.0/search/"
+        ]
+        
+        # Try different dataset names that EMEL might use
+        dataset_names = [
+            "parques-de-estacionamento",
+            "parques-estacionamento", 
+            "parking-lots",
+            "estacionamento-lisboa",
+            "emel-parking"
+        ]
+        
+        locations = []
+        
+        # Query every endpoint/dataset combination at once and keep the first one with parking lots,
+        # so a dead endpoint costs one timeout instead of one per dataset name
+        session = get_http_session()
+        candidates = [(api_base, dataset) for api_base in api_endpoints for dataset in dataset_names]
+        executor = ThreadPoolExecutor(max_workers=len(candidates))
+        try:
+            futures = [
+                executor.submit(fetch_emel_locations, session, api_base, dataset)
+                for api_base, dataset in candidates
+            ]
+            for future in as_completed(futures):
+                try:
+                    locations = future.result()
+                except (ValueError, TypeError, AttributeError):
+                    continue  # An unexpected payload from one endpoint must not abort the whole probe
+                if locations:
+                    break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        # If no real data was loaded, try to load from hardcoded real coordinates
+        if not locations:
+            st.info("API data unavailable. Using real Lisbon parking coordinates from EMEL database.")
+            return (*load_real_lisbon_coordinates(datetime.now().date()), False)
+        
+        # Generate some historical data based on the loaded locations (reused if they are unchanged)
+        locations = to_categories(pd.DataFrame(locations), LOCATION_TEXT_COLUMNS)
+        history = synthesize_api_history(locations, datetime.now().date())
+        
+    except Exception as e:
+        st.warning(f"Could not load real EMEL data: {str(e)}. Using simulated data instead.")
+        return (*load_simulated_emel_data(), False)
+    
+    # Outside the try: a failed cache write must not throw away good API data
+    save_cached_frames("api", locations, history)
+    return locations, history, True
+
+@st.cache_data  # today is part of the cache key, so the history's dates roll over at midnight
+def load_real_lisbon_coordinates(today):
+    """
+    Load real Lisbon parking coordinates from EMEL database, with history ending on today
+    """
+    # Seeded generator so capacities, prices and history (and the model cached from them) match across restarts
+    rng = np.random.default_rng(42)
+    
+    # Create DataFrame with real EMEL coordinates
+    locations = build_parking_locations(rng)
+    
+    # Generate historical data with more realistic variation
+    history = synthesize_history(locations, rng, today)
+    return to_categories(locations, LOCATION_TEXT_COLUMNS), history
+
+@st.cache_data
+def load_simulated_emel_data():
+    # Reuse the data generated by a previous run if it is still on disk
+    cached = read_cached_frames("simulated")
+    if cached is not None:
+        return cached
+
+    # Seeded generator so every run produces the same simulated data
+    rng = np.random.default_rng(42)
+
+    # Same real Lisbon parking locations as the coordinates fallback
+    locations = build_parking_locations(rng)
+
+    # Simulated EMEL occupancy history (3 days, hourly) as (lot, day, hour) arrays
+    n_lots, n_days, n_hours = len(locations), 3, 24
+    hours = np.arange(n_hours)
+    dates = pd.date_range("2025-10-10", periods=n_days)
+    capacity = locations["lugares_totais"].to_numpy()[:, None, None]
+
+    # Simulate realistic occupancy patterns (higher during day, lower at night)
+    base_occupancy = 0.3 + 0.4 * np.sin((hours - 6) * np.pi / 12)  # Peak around 12-14h
+    base_occupancy = np.clip(base_occupancy, 0.1, 0.9)  # Keep between 10-90%
+
+    noise = rng.normal(0, 0.1, size=(n_lots, n_days, n_hours))
+    occupied = (capacity * base_occupancy + noise).astype(int)
+    occupied = np.clip(occupied, 0, capacity)  # Ensure valid range
+
+    history = history_frame(locations, dates, occupied)
+    locations = to_categories(locations, LOCATION_TEXT_COLUMNS)
+    save_cached_frames("simulated", locations, history)
+    return locations, history
+
+# --------------------------------------------------------------
+# 🧮 Data Preprocessing
+# --------------------------------------------------------------
+
+@st.cache_data
+def preprocess(history):
+    """Add timestamp, weekday and vacancy columns to the raw history (cached across reruns)"""
+    # Create timestamp from data (already datetime64 midnights) and hora columns, on a new frame
+    history = history.assign(timestamp=history["data"] + pd.to_timedelta(history["hora"].to_numpy(), unit="h"))
+    history["weekday"] = history["timestamp"].dt.dayofweek.astype("int8")
+
+    # Keep each parking lot's rows together in time order (API days arrive newest first)
+    history = history.sort_values(["id_parque", "timestamp"], ignore_index=True)
+    # Vacancy is the complement of the (already float32) occupancy rate, so no division is needed
+    history["prob_vacant"] = (100 - history["taxa_ocupacao"].to_numpy()) * np.float32(0.01)
+
+    # Only a few distinct dates, so store them as a categorical for cheaper Arrow serialization
+    history["data"] = history["data"].astype("category")
+
+    # Ensure we have valid probability data
+    if history['prob_vacant'].isna().any() or history['prob_vacant'].min() < 0 or history['prob_vacant'].max() > 1:
+        st.error("Invalid probability data detected. Regenerating...")
+        # Regenerate with proper probabilities
+        history['prob_vacant'] = np.random.uniform(0.1, 0.9, len(history))
+
+    return history
+
+# --------------------------------------------------------------
+# 🚪 Entry Point
+# --------------------------------------------------------------
+
+def load(use_api=True):
+    """
+    Return (locations, history), from the EMEL API when use_api is set, else simulated
+    """
+    if not use_api:
+        return load_simulated_emel_data()
+    
+    # The API was unreachable earlier in this session, so don't wait on it again.
+    # Kept out of the cached loader, whose result is shared by every session.
+    if st.session_state.get("emel_api_unavailable"):
+        return load_real_lisbon_coordinates(datetime.now().date())
+    
+    locations, history, loaded_from_api = load_real_emel_data()  # Falls back to real coordinates if the API is down
+    if not loaded_from_api:
+        st.session_state["emel_api_unavailable"] = True
+    return locations, history
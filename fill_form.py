@@ -4,22 +4,28 @@ import time
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
 
 
-def fill_input_by_label(driver, label_text: str, value: str) -> None:
+# Lowercased text of every form question block with its first input or textarea, in one round-trip
+FIELD_BLOCKS_JS = """
+return Array.from(document.querySelectorAll('div[role="listitem"]'))
+    .map(block => [block.innerText.toLowerCase(), block.querySelector('input, textarea')])
+    .filter(([text, elem]) => elem !== null);
+"""
+
+
+def find_fields(driver) -> list:
+    # (block text, input element) pairs, read once instead of rescanning the form per field
+    return driver.execute_script(FIELD_BLOCKS_JS)
+
+
+def fill_input_by_label(fields: list, label_text: str, value: str) -> None:
     # Find form question block containing the label text
-    blocks = driver.find_elements(By.CSS_SELECTOR, 'div[role="listitem"]')
-    for block in blocks:
-        if label_text.lower() in block.text.lower():
-            # Try to find an input or textarea inside this block
-            inputs = block.find_elements(By.CSS_SELECTOR, 'input, textarea')
-            if inputs:
-                elem = inputs[0]
-                elem.clear()
-                elem.send_keys(value)
-                return
+    for block_text, elem in fields:
+        if label_text.lower() in block_text:
+            elem.clear()
+            elem.send_keys(value)
+            return
     # If not found, do nothing (field may be optional)
 
 
@@ -37,20 +43,27 @@ def main() -> None:
     phone = sys.argv[5] if len(sys.argv) > 5 else "+44 20 7946 0958"
     comments = sys.argv[6] if len(sys.argv) > 6 else "Automated submission from Selenium."
 
-    # Launch Chrome with automatic driver installation
-    driver = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()))
-    driver.maximize_window()
+    # Launch Chrome headless, stop waiting once the DOM is ready, and skip downloading images
+    options = webdriver.ChromeOptions()
+    options.page_load_strategy = "eager"
+    options.add_argument("--headless=new")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    # Selenium Manager finds (or downloads once and caches) a matching chromedriver
+    driver = webdriver.Chrome(options=options)
 
     try:
         driver.get(form_url)
         time.sleep(2)
 
         # Values (can be overridden via CLI args)
-        fill_input_by_label(driver, "Name", name)
-        fill_input_by_label(driver, "Email", email)
-        fill_input_by_label(driver, "Address", address)
-        fill_input_by_label(driver, "Phone number", phone)
-        fill_input_by_label(driver, "Comments", comments)
+        fields = find_fields(driver)
+        fill_input_by_label(fields, "Name", name)
+        fill_input_by_label(fields, "Email", email)
+        fill_input_by_label(fields, "Address", address)
+        fill_input_by_label(fields, "Phone number", phone)
+        fill_input_by_label(fields, "Comments", comments)
 
         # Submit
         buttons = driver.find_elements(By.CSS_SELECTOR, 'div[role="button"]')
@@ -4,28 +4,45 @@ import ctypes
 from ctypes import wintypes
 
 
-class POINT(ctypes.Structure):
-    _fields_ = [("x", wintypes.LONG), ("y", wintypes.LONG)]
+INPUT_MOUSE = 0
+MOUSEEVENTF_MOVE = 0x0001
 
+ES_CONTINUOUS = 0x80000000
+ES_SYSTEM_REQUIRED = 0x00000001
+ES_DISPLAY_REQUIRED = 0x00000002
 
-def get_cursor_pos() -> tuple[int, int]:
-    point = POINT()
-    if not ctypes.windll.user32.GetCursorPos(ctypes.byref(point)):
-        raise OSError("GetCursorPos failed")
-    return point.x, point.y
 
+class MOUSEINPUT(ctypes.Structure):
+    _fields_ = [
+        ("dx", wintypes.LONG),
+        ("dy", wintypes.LONG),
+        ("mouseData", wintypes.DWORD),
+        ("dwFlags", wintypes.DWORD),
+        ("time", wintypes.DWORD),
+        ("dwExtraInfo", ctypes.c_size_t),  # ULONG_PTR
+    ]
 
-def set_cursor_pos(x: int, y: int) -> None:
-    if not ctypes.windll.user32.SetCursorPos(x, y):
-        raise OSError("SetCursorPos failed")
+
+class INPUT(ctypes.Structure):
+    # MOUSEINPUT is the largest member of the INPUT union, so this matches sizeof(INPUT)
+    _fields_ = [("type", wintypes.DWORD), ("mi", MOUSEINPUT)]
 
 
 def jiggle_once(pixels: int = 2) -> None:
-    x, y = get_cursor_pos()
-    # Small movement right and back to avoid disrupting the user
-    set_cursor_pos(x + pixels, y)
-    time.sleep(0.05)
-    set_cursor_pos(x, y)
+    # Small relative movement right and back, queued as one batch of input events
+    moves = (INPUT * 2)(
+        INPUT(INPUT_MOUSE, MOUSEINPUT(pixels, 0, 0, MOUSEEVENTF_MOVE, 0, 0)),
+        INPUT(INPUT_MOUSE, MOUSEINPUT(-pixels, 0, 0, MOUSEEVENTF_MOVE, 0, 0)),
+    )
+    if ctypes.windll.user32.SendInput(len(moves), moves, ctypes.sizeof(INPUT)) != len(moves):
+        raise OSError("SendInput failed")
+
+
+def keep_awake(enabled: bool) -> None:
+    # Ask the power manager to keep the system and display on until cleared
+    flags = ES_CONTINUOUS | ES_SYSTEM_REQUIRED | ES_DISPLAY_REQUIRED if enabled else ES_CONTINUOUS
+    if not ctypes.windll.kernel32.SetThreadExecutionState(flags):
+        raise OSError("SetThreadExecutionState failed")
 
 
 def main() -> None:
@@ -36,15 +53,31 @@ def main() -> None:
     interval_seconds = 30
     pixels = 2
 
-    print("Mouse jiggler started. Press Ctrl+C to stop.")
-    print(f"Every {interval_seconds}s: move {pixels}px and back to prevent sleep.")
+    # Moving the mouse is only needed for apps that watch for input (e.g. chat "away" status)
+    if "--jiggle" in sys.argv[1:]:
+        print("Mouse jiggler started. Press Ctrl+C to stop.")
+        print(f"Every {interval_seconds}s: move {pixels}px and back to prevent sleep.")
+
+        try:
+            while True:
+                jiggle_once(pixels)
+                time.sleep(interval_seconds)
+        except KeyboardInterrupt:
+            print("\nStopped.")
+        return
+
+    keep_awake(True)
+    print("Keeping the computer awake. Press Ctrl+C to stop.")
+    print("(Run with --jiggle to move the mouse instead.)")
 
     try:
+        # Nothing to do periodically; just wait for Ctrl+C
         while True:
-            jiggle_once(pixels)
-            time.sleep(interval_seconds)
+            time.sleep(3600)
     except KeyboardInterrupt:
         print("\nStopped.")
+    finally:
+        keep_awake(False)
 
 
 if __name__ == "__main__":
@@ -1,27 +1,69 @@
-import json
+import http.client
 import time
+import urllib.request
 import webbrowser
+from base64 import b64encode
+from functools import cache
 from http.server import HTTPServer, SimpleHTTPRequestHandler
 from pathlib import Path
-from urllib.request import urlopen, Request
+from urllib.parse import unquote, urlsplit
+
+try:
+    from orjson import loads as json_loads  # Optional, faster parser
+except ImportError:
+    from json import loads as json_loads  # stdlib fallback (also accepts bytes)
 
 
 NAZARE_LAT = 39.60
 NAZARE_LON = -9.07
 TIMEZONE = "Europe/Lisbon"
+MARINE_API_HOST = "marine-api.open-meteo.com"
+
+
+@cache
+def marine_api_connection() -> http.client.HTTPSConnection:
+    # One keep-alive connection, so repeated fetches skip the TCP/TLS handshake
+    proxy = urllib.request.getproxies().get("https")
+    if not proxy or urllib.request.proxy_bypass(MARINE_API_HOST):
+        return http.client.HTTPSConnection(MARINE_API_HOST, timeout=15)
+
+    # Honor HTTPS_PROXY like urlopen does: connect to the proxy and tunnel to the API with CONNECT
+    proxy_url = urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+    headers = {}
+    if proxy_url.username:
+        credentials = f"{unquote(proxy_url.username)}:{unquote(proxy_url.password or '')}"
+        headers["Proxy-Authorization"] = "Basic " + b64encode(credentials.encode()).decode()
+    conn = http.client.HTTPSConnection(proxy_url.hostname, proxy_url.port or 80, timeout=15)
+    conn.set_tunnel(MARINE_API_HOST, headers=headers)
+    return conn
 
 
 def fetch_wave_height_m() -> float | None:
     # Open-Meteo Marine API (no key required)
-    url = (
-        "https://marine-api.open-meteo.com/v1/marine"
+    path = (
+        "/v1/marine"
         f"?latitude={NAZARE_LAT}&longitude={NAZARE_LON}"
         "&hourly=wave_height"
         f"&timezone={TIMEZONE.replace('/', '%2F')}"
     )
-    req = Request(url, headers={"User-Agent": "curl/8"})
-    with urlopen(req, timeout=15) as resp:
-        data = json.loads(resp.read().decode("utf-8"))
+    conn = marine_api_connection()
+    last_error = None
+    for _ in range(2):
+        try:
+            conn.request("GET", path, headers={"User-Agent": "curl/8"})
+            resp = conn.getresponse()
+            body = resp.read()
+            break
+        except (http.client.HTTPException, ConnectionError) as e:
+            # The server may have closed the idle connection; reconnect once
+            conn.close()
+            last_error = e
+    else:
+        raise OSError(f"Marine API request failed: {last_error}") from last_error
+    # Redirects are not followed (urlopen did); the API serves this path directly
+    if resp.status != 200:
+        raise OSError(f"HTTP {resp.status} {resp.reason}")
+    data = json_loads(body)  # Parse the bytes directly, no decode step
 
     hourly = data.get("hourly", {})
     times = hourly.get("time", [])
@@ -1,20 +1,71 @@
 import csv
 import sys
-import time
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+
+# BambooHR careers pages usually render job cards/rows with anchor links
+CARD_SELECTOR = 'a[href*="/jobs/"], a[href*="/careers/"], a[class*="job" i], [role="link"][class*="job" i]'
+
+# Keep scrolling to the bottom until the page stops adding nodes (quiet_ms), or max_ms passes
+SCROLL_UNTIL_SETTLED_JS = """
+const [quietMs, maxMs, done] = arguments;
+let finished = false;
+const finish = () => {
+    if (finished) return;
+    finished = true;
+    observer.disconnect();
+    clearInterval(scroller);
+    clearTimeout(quiet);
+    clearTimeout(cap);
+    done();
+};
+let quiet = setTimeout(finish, quietMs);
+const observer = new MutationObserver(() => {
+    clearTimeout(quiet);
+    quiet = setTimeout(finish, quietMs);
+});
+observer.observe(document.body, {childList: true, subtree: true});
+const scroller = setInterval(() => window.scrollTo(0, document.body.scrollHeight), 400);
+const cap = setTimeout(finish, maxMs);
+window.scrollTo(0, document.body.scrollHeight);
+"""
+SCROLL_QUIET_MS = 1000
+SCROLL_MAX_SECONDS = 15
+
+# Read link, title and location of every card inside the page, in one WebDriver round-trip
+EXTRACT_CARDS_JS = """
+const isLocation = el => (el.getAttribute('class') || '').includes('location')
+    || el.textContent.toLowerCase().includes('location');
+const findLocation = root => Array.from(root.querySelectorAll('*')).find(isLocation);
+return Array.from(document.querySelectorAll(arguments[0])).map(a => {
+    // Title heuristics: text content, aria-label, or nested heading element
+    const heading = a.querySelector('h1, h2, h3, .job-title, [class*="title" i]');
+    // Location heuristics: descendant, else sibling, with 'location' in class/text
+    const loc = findLocation(a) || (a.parentElement ? findLocation(a.parentElement) : null);
+    return {
+        href: a.href || a.getAttribute('href') || '',
+        title: a.innerText.trim() || (a.getAttribute('aria-label') || '').trim() || (heading ? heading.innerText.trim() : ''),
+        location: loc ? loc.innerText.trim() : ''
+    };
+});
+"""
 
 
 def main() -> None:
     url = sys.argv[1] if len(sys.argv) > 1 else "https://people.bamboohr.com/careers"
 
-    driver = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()))
-    driver.maximize_window()
+    # Headless, stop waiting once the DOM is ready, and skip downloading images
+    options = webdriver.ChromeOptions()
+    options.page_load_strategy = "eager"
+    options.add_argument("--headless=new")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    # Selenium Manager finds (or downloads once and caches) a matching chromedriver
+    driver = webdriver.Chrome(options=options)
 
     try:
         driver.get(url)
@@ -27,68 +78,25 @@ def main() -> None:
             )
         )
 
-        # Scroll to load more (handles infinite scroll/lazy load)
-        last_height = driver.execute_script("return document.body.scrollHeight")
-        stable_rounds = 0
-        for _ in range(20):
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(1.2)
-            new_height = driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
-                stable_rounds += 1
-                if stable_rounds >= 2:
-                    break
-            else:
-                stable_rounds = 0
-            last_height = new_height
-
-        jobs = []
-        # BambooHR careers pages usually render job cards/rows with anchor links
-        cards = driver.find_elements(
-            By.CSS_SELECTOR,
-            'a[href*="/jobs/"], a[href*="/careers/"], a[class*="job" i], [role="link"][class*="job" i]'
-        )
-        seen = set()
-        for a in cards:
-            href = a.get_attribute('href') or ''
-            if not href or href in seen:
-                continue
-            seen.add(href)
-
-            # Title heuristics: text content, aria-label, or nested heading element
-            title = a.text.strip() or (a.get_attribute('aria-label') or '').strip()
-            if not title:
-                try:
-                    h = a.find_element(By.CSS_SELECTOR, 'h1, h2, h3, .job-title, [class*="title" i]')
-                    title = h.text.strip()
-                except Exception:
-                    title = ''
-
-            # Location heuristics: sibling or descendant with 'location' in class/text
-            location = ''
-            try:
-                loc_el = a.find_element(By.XPATH, './/*[contains(@class, "location") or contains(translate(normalize-space(.), "LOCATION", "location"), "location")]')
-                location = loc_el.text.strip()
-            except Exception:
-                try:
-                    parent = a.find_element(By.XPATH, './..')
-                    loc_el2 = parent.find_element(By.XPATH, './/*[contains(@class, "location") or contains(translate(normalize-space(.), "LOCATION", "location"), "location")]')
-                    location = loc_el2.text.strip()
-                except Exception:
-                    location = ''
-
-            jobs.append({
-                'title': title,
-                'location': location,
-                'link': href,
-            })
-
-        with open('jobs.csv', 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=['title', 'location', 'link'])
-            writer.writeheader()
-            writer.writerows(jobs)
-
-        print(f"Saved {len(jobs)} jobs to jobs.csv")
+        # Scroll to load more (handles infinite scroll/lazy load), returning as soon as the DOM settles
+        driver.set_script_timeout(SCROLL_MAX_SECONDS + 5)
+        driver.execute_async_script(SCROLL_UNTIL_SETTLED_JS, SCROLL_QUIET_MS, SCROLL_MAX_SECONDS * 1000)
+
+        cards = driver.execute_script(EXTRACT_CARDS_JS, CARD_SELECTOR)
+
+        # Write each new job straight to the CSV instead of collecting them first
+        with open('jobs.csv', 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+            writer = csv.writer(f)
+            writer.writerow(('title', 'location', 'link'))
+            seen = set()
+            for card in cards:
+                href = card['href']
+                if not href or href in seen:
+                    continue
+                seen.add(href)
+                writer.writerow((card['title'], card['location'], href))
+
+        print(f"Saved {len(seen)} jobs to jobs.csv")
 
     finally:
         driver.quit()